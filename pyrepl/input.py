@@ -17,11 +17,36 @@
 # CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF OR IN
 # CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 
+import functools
 import unicodedata
 from collections import deque
 
 from pyrepl.keymap import compile_keymap, parse_keys
 
+# keys are nearly always ASCII, so look control characters up in a table;
+# for the rest isprintable() weeds out almost everything before we need
+# to ask unicodedata (which, unlike isprintable(), doesn't also reject
+# things like no-break spaces or zero-width joiners)
+_ASCII_CTRL = bytes(1 if (c < 0x20 or c == 0x7F) else 0 for c in range(128))
+
+
+def _is_control(key):
+    o = ord(key)
+    if o < 128:
+        return _ASCII_CTRL[o]
+    return not key.isprintable() and unicodedata.category(key) == "Cc"
+
+
+@functools.lru_cache(maxsize=8)
+def _compile_keymap(keymap):
+    # readers rebuild their translators from the same few keymaps over
+    # and over, so only parse and compile each of them once
+    d = {}
+    for keyspec, command in keymap:
+        keyseq = tuple(parse_keys(keyspec))
+        d[keyseq] = command
+    return d, compile_keymap(d, ())
+
 
 class InputTranslator:
     def push(self, evt):
@@ -43,48 +68,68 @@ class KeymapTranslator(InputTranslator):
         self.keymap = keymap
         self.invalid_cls = invalid_cls
         self.character_cls = character_cls
-        d = {}
-        for keyspec, command in keymap:
-            keyseq = tuple(parse_keys(keyspec))
-            d[keyseq] = command
+        d, ck = _compile_keymap(tuple(map(tuple, keymap)))
         if self.verbose:
             print(d)
-        self.k = self.ck = compile_keymap(d, ())
+        # push() adds characters to the top level, so don't share that
+        self.k = self.ck = dict(ck)
+        # nearly every push() is followed by a get(), so keep a single
+        # result in _first and only queue up further ones in results
+        self._first = None
         self.results = deque()
         self.stack = []
+        if not verbose:
+            self.push = self._push_fast
 
     def push(self, evt):
-        if self.verbose:
-            print("pushed", evt.data, end="")
+        # only verbose translators get here, the others call _push_fast()
+        # directly; report what it did from the state it leaves behind
+        print("pushed", evt.data, end="")
+        self._push_fast(evt)
+        if self.stack:
+            print("transition")
+            return
+        cmd, keys = self.results[-1] if self.results else self._first
+        if cmd is self.invalid_cls:
+            print("invalid")
+        else:
+            print("matched", cmd)
+
+    def _push_fast(self, evt):
+        # this runs for every key, so keep it free of verbose checks
         key = evt.data
-        d = self.k.get(key)
+        k = self.k
+        d = k.get(key)
         if isinstance(d, dict):
-            if self.verbose:
-                print("transition")
             self.stack.append(key)
             self.k = d
-        else:
-            if d is None:
-                if self.verbose:
-                    print("invalid")
-                if self.stack or len(key) > 1 or unicodedata.category(key) == "C":
-                    self.results.append((self.invalid_cls, self.stack + [key]))
-                else:
-                    # small optimization:
-                    self.k[key] = self.character_cls
-                    self.results.append((self.character_cls, [key]))
+            return
+        stack = self.stack
+        if d is None:
+            if stack or len(key) > 1 or _is_control(key):
+                result = (self.invalid_cls, stack + [key])
             else:
-                if self.verbose:
-                    print("matched", d)
-                self.results.append((d, self.stack + [key]))
-            self.stack = []
-            self.k = self.ck
+                # small optimization:
+                k[key] = self.character_cls
+                result = (self.character_cls, [key])
+        else:
+            result = (d, stack + [key])
+        if self._first is None and not self.results:
+            self._first = result
+        else:
+            self.results.append(result)
+        self.stack = []
+        self.k = self.ck
 
     def get(self):
+        result = self._first
+        if result is not None:
+            self._first = None
+            return result
         if self.results:
             return self.results.popleft()
         else:
             return None
 
     def empty(self):
-        return not self.results
+        return self._first is None and not self.results
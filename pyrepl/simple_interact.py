@@ -19,6 +19,7 @@
 # CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 
 import linecache
+import re
 import sys
 
 from pyrepl.readline import _get_reader, multiline_input
@@ -32,6 +33,8 @@ def _strip_final_indent(text):
     # kill spaces and tabs at the end, but only if they follow '\n'.
     # meant to remove the auto-indentation only (although it would of
     # course also remove explicitly-added indentation).
+    if not text.endswith((" ", "\t")):
+        return text
     short = text.rstrip(" \t")
     n = len(short)
     if n > 0 and text[n - 1] == "\n":
@@ -39,6 +42,17 @@ def _strip_final_indent(text):
     return text
 
 
+# Anything spanning several lines has to go through the compiler, but a
+# single line can only be an incomplete statement if it contains a
+# block-opening colon, a line continuation, an open bracket, a decorator
+# or the start of a triple-quoted string.
+_maybe_incomplete = re.compile(r"[\n:\\(\[{@]|'''|" r'"""').search
+
+
+def _needs_compile(src):
+    return _maybe_incomplete(src) is not None
+
+
 def run_multiline_interactive_console():
     import code
 
@@ -49,6 +63,8 @@ def run_multiline_interactive_console():
     def more_lines(unicodetext):
         # ooh, look at the hack:
         src = _strip_final_indent(unicodetext)
+        if not _needs_compile(src):
+            return False
         try:
             code = console.compile(src, "<stdin>", "single")
         except (OverflowError, SyntaxError, ValueError):
@@ -58,6 +74,10 @@ def run_multiline_interactive_console():
 
     while 1:
         try:
+            # this has to happen even on a line-buffered tty: the prompt
+            # goes straight to the terminal, so anything written without a
+            # trailing newline would otherwise show up after it.  With
+            # nothing buffered the flush doesn't make a syscall anyway.
             try:
                 sys.stdout.flush()
             except Exception:
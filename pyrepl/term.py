@@ -68,7 +68,6 @@ class TermCapability:
 
     def __init__(self, buffer):
         self._buffer = buffer
-        self._args = []
 
         self._bytes = curses.tigetstr(self.name)
         if self._bytes is None and not self.optional:
@@ -80,11 +79,10 @@ class TermCapability:
 
     def __call__(self, *args):
         if self.supported:
-            self._args = args
-            self._buffer.push(self)
+            self._buffer.push_capability(self, args)
 
-    def text(self):
-        return curses.tparm(self._bytes, *self._args)
+    def text(self, *args):
+        return curses.tparm(self._bytes, *args)
 
 
 class Bell(TermCapability):
@@ -128,9 +126,8 @@ class CursorLeft(TermCapability):
     name = "cub1"
     optional = True
 
-    def text(self):
-        assert len(self._args) == 1  # cursor_down needs to have been called with dx
-        return curses.tparm(self._args[0] * self._bytes)
+    def text(self, n):
+        return curses.tparm(n * self._bytes)
 
 
 class ParmDownCursor(TermCapability):
@@ -146,9 +143,8 @@ class CursorDown(TermCapability):
     name = "cud1"
     optional = True
 
-    def text(self):
-        assert len(self._args) == 1  # cursor_down needs to have been called with dy
-        return curses.tparm(self._args[0] * self._bytes)
+    def text(self, n):
+        return curses.tparm(n * self._bytes)
 
 
 class ParmRightCursor(TermCapability):
@@ -164,9 +160,8 @@ class CursorRight(TermCapability):
     name = "cuf1"
     optional = True
 
-    def text(self):
-        assert len(self._args) == 1  # cursor_down needs to have been called with dx
-        return curses.tparm(self._args[0] * self._bytes)
+    def text(self, n):
+        return curses.tparm(n * self._bytes)
 
 
 class CursorAddress(TermCapability):
@@ -189,9 +184,8 @@ class CursorUp(TermCapability):
     name = "cuu1"
     optional = True
 
-    def text(self):
-        assert len(self._args) == 1  # cursor_down needs to have been called with dy
-        return curses.tparm(self._args[0] * self._bytes)
+    def text(self, n):
+        return curses.tparm(n * self._bytes)
 
 
 class ParmDeleteCharacter(TermCapability):
@@ -1,16 +1,22 @@
 import os
 
-TREACE_FILENAME = os.environ.get("PYREPL_TRACE")
-if TREACE_FILENAME is not None:
-    TRACE_FILE = open(TREACE_FILENAME, "a")
+TRACE_FILENAME = os.environ.get("PYREPL_TRACE")
+if TRACE_FILENAME is not None:
+    TRACE_FILE = open(TRACE_FILENAME, "a")
 else:
     TRACE_FILE = None
 
+TRACE_ENABLED = TRACE_FILE is not None
 
-def trace(line, *k, **kw):
-    if TRACE_FILE is None:
-        return
-    if k or kw:
-        line = line.format(*k, **kw)
-    TRACE_FILE.write(line + "\n")
-    TRACE_FILE.flush()
+if TRACE_ENABLED:
+
+    def trace(line, *k, **kw):
+        if k or kw:
+            line = line.format(*k, **kw)
+        TRACE_FILE.write(line + "\n")
+        TRACE_FILE.flush()
+
+else:
+
+    def trace(line, *k, **kw):
+        pass
@@ -19,6 +19,7 @@
 # CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF OR IN
 # CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 
+import codecs
 import curses
 import errno
 import functools
@@ -59,11 +60,10 @@ from pyrepl.term import (
     ParmUpCursor,
     ScrollForward,
     ScrollReverse,
-    TermCapability,
     tcgetattr,
     tcsetattr,
 )
-from pyrepl.trace import trace
+from pyrepl.trace import TRACE_ENABLED, trace
 from pyrepl.unix_eventqueue import EventQueue
 
 _error = (termios.error, curses.error, InvalidTerminal)
@@ -110,74 +110,97 @@ del r, maybe_add_baudrate
 
 delayprog = re.compile(b"\\$<([0-9]+)((?:/|\\*){0,2})>")
 
-try:
-    poll = select.poll
-except AttributeError:
-    # this is exactly the minumum necessary to support what we
-    # do with poll objects
-    class poll:
-        def __init__(self):
-            pass
-
-        def register(self, fd, flag):
-            self.fd = fd
-
-        def poll(self):  # note: a 'timeout' argument would be *milliseconds*
-            r, w, e = select.select([self.fd], [], [])
-            return r
-
-
-POLLIN = getattr(select, "POLLIN", None)
-
 
 class Buffer:
     def __init__(self, svtermstate, output_fd, encoding):
-        self.__svtermstate = svtermstate
         self.__output_fd = output_fd
         self.__pad_char = PadChar(self)
         self.__encoding = encoding
+        # none of these change for the life of the console, so don't
+        # look them up again for every delay in __tputs.
+        # using .get() means that things will blow up
+        # only if the bps is actually needed (which I'm
+        # betting is pretty unlkely)
+        self.__bps = ratedict.get(svtermstate.ospeed)
+        self.__pad_supported = self.__pad_char.supported
+        self.__pad_text = self.__pad_char.text
+        # output of the capabilities used without arguments (clear to
+        # end of line, cursor visibility, ...) never changes
+        self.__constant_text = {}
         self.__buf = []
 
-    def push(self, item):
-        self.__buf.append(item)
+    def push(self, text):
+        # encode text right away and merge it with text pushed just
+        # before, so that flush() mostly sees a few large chunks
+        data = text.encode(self.__encoding, "replace")
+        buf = self.__buf
+        if buf and isinstance(buf[-1], bytearray):
+            buf[-1] += data
+        else:
+            buf.append(bytearray(data))
+
+    def push_capability(self, cap, args):
+        self.__buf.append((cap, args))
 
     def clear(self):
         self.__buf.clear()
 
-    def __tputs(self, fmt, prog=delayprog):
+    def __write_out(self, out):
+        # os.write() may not take everything at once
+        while out:
+            n = os.write(self.__output_fd, out)
+            del out[:n]
+
+    def __tputs(self, fmt, out, search=delayprog.search):
         """A Python implementation of the curses tputs function; the
         curses one can't really be wrapped in a sane manner.
 
         I have the strong suspicion that this is complexity that
         will never do anyone any good."""
-        # using .get() means that things will blow up
-        # only if the bps is actually needed (which I'm
-        # betting is pretty unlkely)
-        bps = ratedict.get(self.__svtermstate.ospeed)
+        if b"$<" not in fmt:
+            # no delays embedded, which is what any modern terminal gives us
+            out += fmt
+            return
+        bps = self.__bps
+        pad_supported = self.__pad_supported
         while 1:
-            m = prog.search(fmt)
+            m = search(fmt)
             if not m:
-                os.write(self.__output_fd, fmt)
+                out += fmt
                 break
             x, y = m.span()
-            os.write(self.__output_fd, fmt[:x])
+            out += fmt[:x]
             fmt = fmt[y:]
             delay = int(m.group(1))
             if b"*" in m.group(2):
                 delay *= self.height
-            if self.__pad_char.supported:
+            if pad_supported:
                 nchars = (bps * delay) / 1000
-                os.write(self.__output_fd, self.__pad_char.text(nchars))
+                out += self.__pad_text(nchars)
             else:
+                # the delay only makes sense once the preceding output
+                # has actually reached the terminal
+                self.__write_out(out)
                 time.sleep(float(delay) / 1000.0)
 
     def flush(self):
+        # collect everything into a single write rather than issuing one
+        # syscall per item
+        out = bytearray()
         for item in self.__buf:
-            if isinstance(item, TermCapability):
-                self.__tputs(item.text())
+            if isinstance(item, bytearray):
+                out += item
+                continue
+            cap, args = item
+            if args:
+                text = cap.text(*args)
             else:
-                os.write(self.__output_fd, item.encode(self.__encoding, "replace"))
+                text = self.__constant_text.get(cap)
+                if text is None:
+                    text = self.__constant_text[cap] = cap.text()
+            self.__tputs(text, out)
         self.clear()
+        self.__write_out(out)
 
 
 class UnixConsole(Console):
@@ -186,6 +209,7 @@ class UnixConsole(Console):
             encoding = sys.getdefaultencoding()
 
         self.encoding = encoding
+        self._decoder = codecs.getincrementaldecoder(encoding)("replace")
 
         if isinstance(f_in, int):
             self.input_fd = f_in
@@ -194,8 +218,7 @@ class UnixConsole(Console):
 
         f_out = f_out if isinstance(f_out, int) else f_out.fileno()
 
-        self.pollob = poll()
-        self.pollob.register(self.input_fd, POLLIN)
+        self._wait_rlist = [self.input_fd]
         curses.setupterm(term, f_out)
         self.term = term
 
@@ -228,19 +251,22 @@ class UnixConsole(Console):
 
         ## work out how we're going to sling the cursor around
         if self._parm_left_cursor.supported and self._parm_right_cursor.supported:
-            self.__move_x = self.__move_x_parm_cursor
+            left, right = self._parm_left_cursor, self._parm_right_cursor
         elif self._cursor_left.supported and self._cursor_right.supported:
-            self.__move_x = self.__move_x_cursor
+            left, right = self._cursor_left, self._cursor_right
         else:
             raise InvalidTerminal("insufficient terminal (horizontal)")
 
         if self._parm_up_cursor.supported and self._parm_down_cursor.supported:
-            self.__move_y = self.__move_y_parm_cursor
+            up, down = self._parm_up_cursor, self._parm_down_cursor
         elif self._cursor_up.supported and self._cursor_down.supported:
-            self.__move_y = self.__move_y_cursor
+            up, down = self._cursor_up, self._cursor_down
         else:
             raise InvalidTerminal("insufficient terminal (vertical)")
 
+        self.__move_short = self.__make_move_short(left, right, up, down)
+        self.__move_tall = self.__make_move_tall(self._cursor_address)
+
         if self._delete_character.supported:
             self.delete_character = self._delete_character
         elif self._parm_delete_character.supported:
@@ -262,6 +288,7 @@ class UnixConsole(Console):
 
     def change_encoding(self, encoding):
         self.encoding = encoding
+        self._decoder = codecs.getincrementaldecoder(encoding)("replace")
 
     def refresh(self, screen, c_xy):
         # this function is still too long (over 90 lines)
@@ -273,9 +300,8 @@ class UnixConsole(Console):
                 self.__write("\n")
                 self.__posxy = 0, len(self.screen)
                 self.screen.append("")
-        else:
-            while len(self.screen) < len(screen):
-                self.screen.append("")
+        elif len(self.screen) < len(screen):
+            self.screen.extend([""] * (len(screen) - len(self.screen)))
 
         if len(screen) > self.height:
             self.__gone_tall = 1
@@ -351,8 +377,13 @@ class UnixConsole(Console):
         # reuse the oldline as much as possible, but stop as soon as we
         # encounter an ESCAPE, because it might be the start of an escape
         # sequene
-        while x < minlen and oldline[x] == newline[x] and newline[x] != "\x1b":
-            x += 1
+        if "\x1b" not in newline and oldline[:minlen] == newline[:minlen]:
+            # typing at the end of a line: one line is a prefix of the
+            # other, which the string comparison finds without the loop
+            x = minlen
+        else:
+            while x < minlen and oldline[x] == newline[x] and newline[x] != "\x1b":
+                x += 1
         if oldline[x:] == newline[x + 1 :] and self.insert_character is not None:
             if (
                 y == self.__posxy[1]
@@ -400,45 +431,33 @@ class UnixConsole(Console):
     def __write(self, text):
         self.__buffer.push(text)
 
-    def __move_y_cursor(self, y):
-        dy = y - self.__posxy[1]
-        if dy > 0:
-            self._cursor_down(dy)
-        elif dy < 0:
-            self._cursor_up(-dy)
-
-    def __move_y_parm_cursor(self, y):
-        dy = y - self.__posxy[1]
-        if dy > 0:
-            self._parm_down_cursor(dy)
-        elif dy < 0:
-            self._parm_up_cursor(-dy)
-
-    def __move_x_column_address(self, x):
-        if x != self.__posxy[0]:
-            self._column_address(x)
-
-    def __move_x_cursor(self, x):
-        dx = x - self.__posxy[0]
-        if dx > 0:
-            self._cursor_right(dx)
-        elif dx < 0:
-            self._cursor_left(-dx)
-
-    def __move_x_parm_cursor(self, x):
-        dx = x - self.__posxy[0]
-        if dx > 0:
-            self._parm_right_cursor(dx)
-        elif dx < 0:
-            self._parm_left_cursor(-dx)
-
-    def __move_short(self, x, y):
-        self.__move_x(x)
-        self.__move_y(y)
-
-    def __move_tall(self, x, y):
-        assert 0 <= y - self.__offset < self.height, y - self.__offset
-        self._cursor_address(y - self.__offset, x)
+    # The capabilities used for cursor motion are fixed once we know
+    # the terminal, so the move functions are built as closures over
+    # them rather than being looked up on self for every motion.
+
+    def __make_move_short(self, left, right, up, down):
+        def move_short(x, y):
+            px, py = self.__posxy
+            dx = x - px
+            if dx > 0:
+                right(dx)
+            elif dx < 0:
+                left(-dx)
+            dy = y - py
+            if dy > 0:
+                down(dy)
+            elif dy < 0:
+                up(-dy)
+
+        return move_short
+
+    def __make_move_tall(self, cursor_address):
+        def move_tall(x, y):
+            offset = self.__offset
+            assert 0 <= y - offset < self.height, y - offset
+            cursor_address(y - offset, x)
+
+        return move_tall
 
     def move_cursor(self, x, y):
         if y < self.__offset or y >= self.__offset + self.height:
@@ -483,6 +502,7 @@ class UnixConsole(Console):
         self._keypad_local()
         self.flushoutput()
         tcsetattr(self.input_fd, termios.TCSADRAIN, self.__svtermstate)
+        self._decoder.reset()
 
         if hasattr(self, "old_sigwinch"):
             signal.signal(signal.SIGWINCH, self.old_sigwinch)
@@ -493,14 +513,28 @@ class UnixConsole(Console):
         self.event_queue.insert(Event("resize", None))
 
     def push_char(self, char):
-        trace("push char {char!r}", char=char)
+        if TRACE_ENABLED:
+            trace("push char {char!r}", char=char)
         self.event_queue.push(char)
 
+    if FIONREAD:
+
+        def __bytes_pending(self):
+            return struct.unpack("i", ioctl(self.input_fd, FIONREAD, b"\0\0\0\0"))[0]
+
+    else:
+
+        def __bytes_pending(self):
+            # we can't tell, so get_event() falls back to single bytes
+            return 0
+
     def get_event(self, block=1):
         while self.event_queue.empty():
             while 1:  # All hail Unix!
                 try:
-                    self.push_char(os.read(self.input_fd, 1))
+                    # read everything that is already available in one go,
+                    # but always ask for at least one byte so that we block
+                    buf = os.read(self.input_fd, self.__bytes_pending() or 1)
                 except OSError as err:
                     if err.errno == errno.EINTR:
                         if not self.event_queue.empty():
@@ -510,13 +544,26 @@ class UnixConsole(Console):
                     else:
                         raise
                 else:
+                    for b in buf:
+                        self.push_char(b)
                     break
             if not block:
                 break
         return self.event_queue.get()
 
     def wait(self):
-        self.pollob.poll()
+        while True:
+            try:
+                select.select(self._wait_rlist, (), ())
+            except InterruptedError:
+                continue
+            except ValueError:
+                # select() can't watch fds at or above FD_SETSIZE (usually
+                # 1024); poll() has no such limit, so use it for those
+                pollob = select.poll()
+                pollob.register(self.input_fd, select.POLLIN)
+                pollob.poll()
+            break
 
     def set_cursor_vis(self, vis):
         if vis:
@@ -585,39 +632,33 @@ class UnixConsole(Console):
         self._bell()
         self.flushoutput()
 
-    if FIONREAD:
-
-        def getpending(self):
-            e = Event("key", "", b"")
-
-            while not self.event_queue.empty():
-                e2 = self.event_queue.get()
-                e.data += e2.data
-                e.raw += e.raw
-
-            amount = struct.unpack("i", ioctl(self.input_fd, FIONREAD, b"\0\0\0\0"))[0]
-            raw = os.read(self.input_fd, amount)
-            data = str(raw, self.encoding, "replace")
-            e.data += data
-            e.raw += raw
-            return e
+    def getpending(self):
+        data_parts = []
+        raw_parts = []
 
-    else:
-
-        def getpending(self):
-            e = Event("key", "", b"")
-
-            while not self.event_queue.empty():
-                e2 = self.event_queue.get()
-                e.data += e2.data
-                e.raw += e.raw
+        while not self.event_queue.empty():
+            e2 = self.event_queue.get()
+            data_parts.append(e2.data)
+            raw_parts.append(e2.raw)
 
+        if FIONREAD:
+            amount = self.__bytes_pending()
+        else:
             amount = 10000
-            raw = os.read(self.input_fd, amount)
-            data = str(raw, self.encoding, "replace")
-            e.data += data
-            e.raw += raw
-            return e
+        raw = os.read(self.input_fd, amount)
+        data = self._decoder.decode(raw)
+        # the read may have stopped in the middle of a multibyte
+        # character: hand its first bytes to the event queue, which will
+        # complete it with whatever get_event() reads next
+        partial = self._decoder.getstate()[0]
+        if partial:
+            self._decoder.reset()
+            raw = raw[: -len(partial)]
+            for b in partial:
+                self.event_queue.push(b)
+        data_parts.append(data)
+        raw_parts.append(raw)
+        return Event("key", "".join(data_parts), b"".join(raw_parts))
 
     def clear(self):
         self._clear_screen()
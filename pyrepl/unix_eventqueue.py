@@ -68,6 +68,11 @@ CTRL_ARROW_KEYCODE = {
 }
 
 
+# push() gets fed one byte at a time; look the bytes objects up here
+# instead of creating a new one for each of them
+_single_bytes = [bytes((i,)) for i in range(256)]
+
+
 def general_keycodes():
     keycodes = {}
     for key, tiname in _keynames.items():
@@ -116,7 +121,7 @@ class EventQueue(object):
 
     def push(self, char):
         ord_char = char if isinstance(char, int) else ord(char)
-        char = bytes(bytearray((ord_char,)))
+        char = _single_bytes[ord_char]
         self.buf.append(ord_char)
         if char in self.k:
             if self.k is self.ck:
@@ -138,7 +143,7 @@ class EventQueue(object):
             self.k = self.ck
             self.insert(Event("key", "\033", bytearray(b"\033")))
             for c in self.flush_buf()[1:]:
-                self.push(chr(c))
+                self.push(c)
 
         else:
             try:
@@ -0,0 +1,39 @@
+import pytest
+
+from pyrepl.console import Event
+from pyrepl.input import KeymapTranslator
+
+
+@pytest.mark.parametrize("verbose", [0, 1])
+@pytest.mark.parametrize(
+    "key, expected",
+    [
+        ("a", "self-insert"),
+        ("\u00a0", "self-insert"),
+        ("\x1c", "invalid-key"),
+        ("\x85", "invalid-key"),
+    ],
+)
+def test_unbound_key(verbose, key, expected):
+    trans = KeymapTranslator(
+        (), verbose=verbose, invalid_cls="invalid-key", character_cls="self-insert"
+    )
+    trans.push(Event("key", key, key.encode()))
+    assert trans.get() == (expected, [key])
+    assert trans.empty()
+
+
+def test_keymap_as_lists():
+    trans = KeymapTranslator([["a", "foo"]], invalid_cls="invalid-key")
+    trans.push(Event("key", "a", b"a"))
+    assert trans.get() == ("foo", ["a"])
+
+
+def test_translators_do_not_share_self_insert():
+    keymap = (("\\C-a", "beginning-of-line"),)
+    first = KeymapTranslator(keymap, character_cls="self-insert")
+    second = KeymapTranslator(keymap, character_cls="isearch-add-character")
+    first.push(Event("key", "x", b"x"))
+    assert first.get() == ("self-insert", ["x"])
+    second.push(Event("key", "x", b"x"))
+    assert second.get() == ("isearch-add-character", ["x"])
@@ -0,0 +1,22 @@
+import codeop
+
+import pytest
+
+from pyrepl.simple_interact import _needs_compile
+
+
+@pytest.mark.parametrize("src", ["if x:", "x = (", "x = \\", "@dec", "'''a"])
+def test_needs_compile(src):
+    assert _needs_compile(src)
+
+
+@pytest.mark.parametrize(
+    "src", ["x = 1", "if x", "'abc", "x", "del x", "1 +", "x = 'a'", "return"]
+)
+def test_simple_line_is_not_incomplete(src):
+    assert not _needs_compile(src)
+    try:
+        code = codeop.CommandCompiler()(src, "<stdin>", "single")
+    except (OverflowError, SyntaxError, ValueError):
+        return
+    assert code is not None
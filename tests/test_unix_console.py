@@ -0,0 +1,76 @@
+import curses
+import os
+
+import pytest
+
+from pyrepl.console import Event
+from pyrepl.term import ClearEol, CursorAddress, tcgetattr
+from pyrepl.unix_console import Buffer, UnixConsole
+
+
+@pytest.fixture
+def pty_buffer():
+    master, slave = os.openpty()
+    try:
+        curses.setupterm("xterm", slave)
+        yield master, Buffer(tcgetattr(slave), slave, "utf-8")
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+@pytest.fixture
+def pty_console():
+    master, slave = os.openpty()
+    console = UnixConsole(slave, slave, "xterm", "utf-8")
+    console.prepare()
+    try:
+        yield master, console
+    finally:
+        console.restore()
+        os.close(master)
+        os.close(slave)
+
+
+def test_capability_arguments_are_kept_per_call(pty_buffer):
+    master, buffer = pty_buffer
+    cursor_address = CursorAddress(buffer)
+    cursor_address(1, 2)
+    cursor_address(3, 4)
+    buffer.flush()
+    assert os.read(master, 1024) == b"\x1b[2;3H\x1b[4;5H"
+
+
+def test_capability_without_arguments(pty_buffer):
+    master, buffer = pty_buffer
+    clear_eol = ClearEol(buffer)
+    clear_eol()
+    buffer.push("ab")
+    clear_eol()
+    buffer.flush()
+    assert os.read(master, 1024) == b"\x1b[Kab\x1b[K"
+
+
+def test_getpending_split_multibyte_character(pty_console):
+    master, console = pty_console
+    os.write(master, b"x\xc3")
+    console.wait()
+    e = console.getpending()
+    assert (e.data, e.raw) == ("x", b"x")
+    os.write(master, b"\xa9a")
+    console.wait()
+    e = console.get_event()
+    assert (e.data, bytes(e.raw)) == ("\xe9", b"\xc3\xa9")
+    e = console.get_event()
+    assert (e.data, bytes(e.raw)) == ("a", b"a")
+
+
+def test_getpending_keeps_raw_bytes_of_queued_events(pty_console):
+    master, console = pty_console
+    console.event_queue.insert(Event("key", "a", b"a"))
+    console.event_queue.insert(Event("key", "up", b"\x1bOA"))
+    os.write(master, b"bc")
+    console.wait()
+    e = console.getpending()
+    assert e.data == "aupbc"
+    assert e.raw == b"a\x1bOAbc"